@@ -31,3 +31,16 @@ VOTE_URLS = {
 HEADLESS = os.getenv("HEADLESS", "False").lower() == "true"
 WAIT_TIMEOUT = int(os.getenv("WAIT_TIMEOUT", "10"))
 
+
+# Mode longue durée : intervalle entre deux sessions de vote (en minutes, 0 = une seule session)
+VOTE_INTERVAL = int(os.getenv("VOTE_INTERVAL", "0"))
+
+# Mode interactif : demander une action manuelle (captcha serveur-prive.net, cookies).
+# Toujours désactivé en mode longue durée et sans terminal sur l'entrée standard.
+INTERACTIVE = os.getenv("INTERACTIVE", "True").lower() == "true" and VOTE_INTERVAL == 0
+
+# Métriques Prometheus
+# Port de l'endpoint HTTP /metrics (0 = désactivé)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Fichier textfile pour node-exporter, écrit après chaque session (vide = désactivé)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
@@ -8,45 +8,67 @@ from .vote_sites import (
     ServeurMinecraftVoteVote,
     ServeurMinecraftVote,
     create_driver,
+    is_interactive,
 )
-from .config import PSEUDO, HEADLESS
+from .config import PSEUDO, HEADLESS, VOTE_INTERVAL, METRICS_PORT, METRICS_TEXTFILE
+from . import metrics
 
 
-def main():
-    """Fonction principale."""
-    print("=" * 60)
-    print("🎮 Script d'Autovote pour Excalia")
-    print("=" * 60)
-    print(f"Pseudo utilisé: {PSEUDO}")
-    print(f"Mode headless: {HEADLESS}")
-    print("=" * 60)
-    print()
+# Sites à voter (dans l'ordre)
+VOTE_SITES = [
+    TopServeursVote,
+    ServeurPriveVote,
+    ServeurMinecraftVoteVote,
+    ServeurMinecraftVote,
+]
+
+
+def run_votes() -> dict:
+    """Effectue une session de vote sur tous les sites.
     
+    Une interruption utilisateur est propagée après la fermeture du
+    navigateur et l'enregistrement des métriques.
+    """
     driver = None
     results = {}
+    interrupted = False
+    crashed = False
+    metrics.start_run(site.site_name for site in VOTE_SITES)
+    
+    # Les sites nécessitant une action manuelle sont ignorés en mode non interactif :
+    # ils ne comptent ni comme tentés, ni comme échoués
+    interactive = is_interactive()
+    vote_sites = []
+    for site in VOTE_SITES:
+        if site.requires_user and not interactive:
+            print(f"⏭️ {site.site_name}: ignoré (action manuelle impossible en mode non interactif)")
+            metrics.record_skipped(site.site_name)
+        else:
+            vote_sites.append(site)
     
     try:
         # Créer le driver Selenium
         print("🔧 Initialisation du navigateur...")
-        driver = create_driver(headless=HEADLESS)
+        with metrics.browser_start():
+            driver = create_driver(headless=HEADLESS)
+        metrics.instrument_driver(driver)
         print("✅ Navigateur initialisé\n")
         
-        # Liste des sites à voter (dans l'ordre)
-        vote_sites = [
-            ("Top-Serveurs", TopServeursVote(driver, PSEUDO)),
-            ("Serveur-Prive", ServeurPriveVote(driver, PSEUDO)),
-            ("Serveur-Minecraft-Vote", ServeurMinecraftVoteVote(driver, PSEUDO)),
-            ("Serveur-Minecraft", ServeurMinecraftVote(driver, PSEUDO)),
-        ]
+        vote_handlers = [site(driver, PSEUDO) for site in vote_sites]
         
         # Effectuer les votes
-        for site_name, vote_handler in vote_sites:
+        for vote_handler in vote_handlers:
+            site_name = vote_handler.site_name
             print(f"\n{'='*60}")
             print(f"📊 Site: {site_name}")
             print(f"{'='*60}")
             
             try:
+                vote_start = time.monotonic()
                 success = vote_handler.vote()
+                # Ne pas mesurer le temps de réaction d'un humain
+                if not vote_handler.prompted:
+                    metrics.observe_step(site_name, "total", time.monotonic() - vote_start)
                 results[site_name] = success
                 
                 if success:
@@ -57,13 +79,14 @@ def main():
             except KeyboardInterrupt:
                 print(f"\n⚠️ Interruption utilisateur lors du vote sur {site_name}")
                 results[site_name] = False
+                interrupted = True
                 break
             except Exception as e:
                 print(f"❌ {site_name}: Erreur - {e}")
                 results[site_name] = False
             
             # Pause entre les sites
-            if vote_sites.index((site_name, vote_handler)) < len(vote_sites) - 1:
+            if vote_handlers.index(vote_handler) < len(vote_handlers) - 1:
                 print("\n⏳ Pause de 3 secondes avant le prochain site...")
                 time.sleep(3)
         
@@ -80,8 +103,9 @@ def main():
         print(f"\nTotal: {success_count}/{len(results)} votes réussis")
         
     except KeyboardInterrupt:
-        print("\n\n⚠️ Interruption utilisateur")
+        interrupted = True
     except Exception as e:
+        crashed = True
         print(f"\n❌ Erreur fatale: {e}")
         import traceback
         traceback.print_exc()
@@ -91,9 +115,58 @@ def main():
             driver.quit()
             print("✅ Navigateur fermé")
     
-    return 0 if all(results.values()) else 1
+    # Les sites non atteints (erreur, interruption) comptent comme des échecs
+    for site in vote_sites:
+        results.setdefault(site.site_name, False)
+    
+    for site_name, success in results.items():
+        metrics.record_vote(site_name, success)
+    if crashed:
+        metrics.record_run("error")
+    elif results and all(results.values()):
+        metrics.record_run("success")
+    else:
+        metrics.record_run("failure")
+    if METRICS_TEXTFILE:
+        metrics.write_textfile(METRICS_TEXTFILE)
+    
+    if interrupted:
+        raise KeyboardInterrupt
+    return results
+
+
+def main():
+    """Fonction principale."""
+    print("=" * 60)
+    print("🎮 Script d'Autovote pour Excalia")
+    print("=" * 60)
+    print(f"Pseudo utilisé: {PSEUDO}")
+    print(f"Mode headless: {HEADLESS}")
+    if VOTE_INTERVAL > 0:
+        print(f"Intervalle entre les sessions: {VOTE_INTERVAL} minutes")
+    print("=" * 60)
+    print()
+    
+    if METRICS_PORT:
+        metrics.start_server(METRICS_PORT)
+    
+    results = {}
+    try:
+        while True:
+            # Une session interrompue ne doit pas garder les résultats précédents
+            results = {}
+            results = run_votes()
+            
+            # Mode longue durée : relancer une session à intervalle régulier
+            if VOTE_INTERVAL <= 0:
+                break
+            print(f"\n⏳ Prochaine session dans {VOTE_INTERVAL} minutes...")
+            time.sleep(VOTE_INTERVAL * 60)
+    except KeyboardInterrupt:
+        print("\n\n⚠️ Interruption utilisateur")
+    
+    return 0 if results and all(results.values()) else 1
 
 
 if __name__ == "__main__":
     sys.exit(main())
-
@@ -0,0 +1,329 @@
+"""Métriques Prometheus pour le script d'autovote.
+
+Les métriques sont exposées via un endpoint HTTP local (``METRICS_PORT``)
+ou écrites dans un fichier texte pour le textfile collector de
+node-exporter (``METRICS_TEXTFILE``). Si ``prometheus_client`` n'est pas
+installé, toutes les fonctions de ce module ne font rien.
+
+Les compteurs et histogrammes n'ont de sens que pour un processus qui
+dure (endpoint HTTP) : le fichier textfile ne contient donc que les
+jauges décrivant la dernière session.
+"""
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+try:
+    from prometheus_client import (
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        start_http_server,
+        write_to_textfile,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    from prometheus_client.parser import text_string_to_metric_families
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+RUN_OUTCOMES = ("success", "failure", "error")
+
+
+if PROMETHEUS_AVAILABLE:
+    # Registre complet, servi par l'endpoint HTTP
+    REGISTRY = CollectorRegistry()
+    # Registre du fichier textfile : uniquement les valeurs de la dernière session
+    TEXTFILE_REGISTRY = CollectorRegistry()
+
+    def _last_run_gauge(name: str, documentation: str, labelnames=()):
+        """Crée une jauge publiée à la fois sur l'endpoint HTTP et dans le textfile."""
+        gauge = Gauge(name, documentation, labelnames, registry=None)
+        REGISTRY.register(gauge)
+        TEXTFILE_REGISTRY.register(gauge)
+        return gauge
+
+    class _OptionalGauge:
+        """Jauge sans label publiée uniquement une fois qu'une valeur est connue.
+        
+        Contrairement à ``Gauge``, rien n'est exporté tant que la valeur n'a
+        pas été définie : une valeur par défaut à 0 écraserait la valeur
+        réelle d'une session précédente dans le textfile.
+        """
+        
+        def __init__(self, name: str, documentation: str):
+            self.name = name
+            self.documentation = documentation
+            self.value = None
+            REGISTRY.register(self)
+            TEXTFILE_REGISTRY.register(self)
+        
+        def set_to_current_time(self):
+            self.value = time.time()
+        
+        def collect(self):
+            if self.value is not None:
+                yield GaugeMetricFamily(self.name, self.documentation, value=self.value)
+
+    VOTES_ATTEMPTED = Counter(
+        "excalia_autovote_votes_attempted_total",
+        "Nombre de votes tentés par site.",
+        ["site"],
+        registry=REGISTRY,
+    )
+    VOTES_SUCCEEDED = Counter(
+        "excalia_autovote_votes_succeeded_total",
+        "Nombre de votes réussis par site.",
+        ["site"],
+        registry=REGISTRY,
+    )
+    VOTES_FAILED = Counter(
+        "excalia_autovote_votes_failed_total",
+        "Nombre de votes échoués par site.",
+        ["site"],
+        registry=REGISTRY,
+    )
+    VOTES_SKIPPED = Counter(
+        "excalia_autovote_votes_skipped_total",
+        "Nombre de votes ignorés par site (action manuelle impossible).",
+        ["site"],
+        registry=REGISTRY,
+    )
+    RUNS = Counter(
+        "excalia_autovote_runs_total",
+        "Nombre de sessions de vote par issue.",
+        ["outcome"],
+        registry=REGISTRY,
+    )
+    STEP_DURATION = Histogram(
+        "excalia_autovote_step_duration_seconds",
+        "Durée de chaque étape du vote.",
+        ["site", "step"],
+        buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+        registry=REGISTRY,
+    )
+    CLOUDFLARE_WAIT = Histogram(
+        "excalia_autovote_cloudflare_wait_seconds",
+        "Durée d'attente de la validation Cloudflare.",
+        ["site", "outcome"],
+        buckets=(1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90),
+        registry=REGISTRY,
+    )
+    BROWSER_START = Histogram(
+        "excalia_autovote_browser_start_seconds",
+        "Durée d'initialisation du navigateur.",
+        ["outcome"],
+        buckets=(1, 2.5, 5, 10, 20, 30, 60),
+        registry=REGISTRY,
+    )
+    WEBDRIVER_COMMANDS = Counter(
+        "excalia_autovote_webdriver_commands_total",
+        "Nombre de commandes WebDriver envoyées.",
+        ["command"],
+        registry=REGISTRY,
+    )
+
+    LAST_VOTE_SUCCESS = _last_run_gauge(
+        "excalia_autovote_last_vote_success",
+        "Résultat du dernier vote par site (1 = succès, 0 = échec).",
+        ["site"],
+    )
+    LAST_STEP_DURATION = _last_run_gauge(
+        "excalia_autovote_last_step_duration_seconds",
+        "Durée de chaque étape lors de la dernière session.",
+        ["site", "step"],
+    )
+    LAST_CLOUDFLARE_WAIT = _last_run_gauge(
+        "excalia_autovote_last_cloudflare_wait_seconds",
+        "Durée d'attente de Cloudflare lors de la dernière session.",
+        ["site", "outcome"],
+    )
+    LAST_BROWSER_START = _last_run_gauge(
+        "excalia_autovote_last_browser_start_seconds",
+        "Durée d'initialisation du navigateur lors de la dernière session.",
+        ["outcome"],
+    )
+    LAST_WEBDRIVER_COMMANDS = _last_run_gauge(
+        "excalia_autovote_last_webdriver_commands",
+        "Nombre de commandes WebDriver envoyées lors de la dernière session.",
+        ["command"],
+    )
+    LAST_RUN_SUCCESS = _last_run_gauge(
+        "excalia_autovote_last_run_success",
+        "Issue de la dernière session (1 = tous les votes réussis, 0 sinon).",
+    )
+    LAST_RUN = _last_run_gauge(
+        "excalia_autovote_last_run_timestamp_seconds",
+        "Horodatage de la fin de la dernière session.",
+    )
+    LAST_SUCCESS = _OptionalGauge(
+        "excalia_autovote_last_success_timestamp_seconds",
+        "Horodatage de la fin de la dernière session entièrement réussie.",
+    )
+
+    # Créer les séries dès le départ pour que increase() voie le premier incrément
+    for _outcome in RUN_OUTCOMES:
+        RUNS.labels(outcome=_outcome)
+
+
+def start_server(port: int) -> bool:
+    """Démarre l'endpoint HTTP /metrics sur le port donné."""
+    if not PROMETHEUS_AVAILABLE:
+        print("⚠️ prometheus_client non disponible, endpoint /metrics désactivé")
+        return False
+    try:
+        start_http_server(port, registry=REGISTRY)
+    except OSError as e:
+        print(f"⚠️ Impossible de démarrer l'endpoint /metrics sur le port {port}: {e}")
+        return False
+    print(f"📈 Métriques exposées sur http://localhost:{port}/metrics")
+    return True
+
+
+def write_textfile(path: str) -> bool:
+    """Écrit les métriques de la dernière session au format textfile pour node-exporter."""
+    if not PROMETHEUS_AVAILABLE:
+        print("⚠️ prometheus_client non disponible, fichier de métriques non écrit")
+        return False
+    # Un processus lancé par cron ne connaît pas la dernière réussite : la reprendre
+    if LAST_SUCCESS.value is None:
+        LAST_SUCCESS.value = _read_textfile_value(path, LAST_SUCCESS.name)
+    try:
+        write_to_textfile(path, TEXTFILE_REGISTRY)
+        return True
+    except OSError as e:
+        print(f"⚠️ Erreur lors de l'écriture des métriques dans {path}: {e}")
+        return False
+
+
+def _read_textfile_value(path: str, name: str):
+    """Lit la valeur d'une métrique sans label dans un textfile existant."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        return None
+    try:
+        for family in text_string_to_metric_families(content):
+            for sample in family.samples:
+                if sample.name == name and not sample.labels:
+                    return sample.value
+    except ValueError as e:
+        print(f"⚠️ Fichier de métriques {path} illisible: {e}")
+    return None
+
+
+def start_run(sites):
+    """Prépare les métriques d'une nouvelle session de vote."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    # Les étapes de la session précédente ne doivent pas rester publiées
+    LAST_VOTE_SUCCESS.clear()
+    LAST_STEP_DURATION.clear()
+    LAST_CLOUDFLARE_WAIT.clear()
+    LAST_BROWSER_START.clear()
+    LAST_WEBDRIVER_COMMANDS.clear()
+    for site in sites:
+        VOTES_ATTEMPTED.labels(site=site)
+        VOTES_SUCCEEDED.labels(site=site)
+        VOTES_FAILED.labels(site=site)
+        VOTES_SKIPPED.labels(site=site)
+
+
+def record_vote(site: str, success: bool):
+    """Enregistre le résultat d'une tentative de vote."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    VOTES_ATTEMPTED.labels(site=site).inc()
+    if success:
+        VOTES_SUCCEEDED.labels(site=site).inc()
+    else:
+        VOTES_FAILED.labels(site=site).inc()
+    LAST_VOTE_SUCCESS.labels(site=site).set(1 if success else 0)
+
+
+def record_skipped(site: str):
+    """Enregistre un vote ignoré volontairement (hors tentatives et échecs)."""
+    if PROMETHEUS_AVAILABLE:
+        VOTES_SKIPPED.labels(site=site).inc()
+
+
+def record_run(outcome: str):
+    """Enregistre l'issue d'une session (``success``, ``failure`` ou ``error``)."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    RUNS.labels(outcome=outcome).inc()
+    LAST_RUN_SUCCESS.set(1 if outcome == "success" else 0)
+    LAST_RUN.set_to_current_time()
+    if outcome == "success":
+        LAST_SUCCESS.set_to_current_time()
+
+
+def observe_cloudflare_wait(site: str, seconds: float, outcome: str):
+    """Enregistre la durée d'attente de Cloudflare (``resolved``, ``timeout`` ou ``error``)."""
+    if PROMETHEUS_AVAILABLE:
+        CLOUDFLARE_WAIT.labels(site=site, outcome=outcome).observe(seconds)
+        LAST_CLOUDFLARE_WAIT.labels(site=site, outcome=outcome).set(seconds)
+
+
+def observe_step(site: str, name: str, seconds: float):
+    """Enregistre la durée d'une étape du vote."""
+    if PROMETHEUS_AVAILABLE:
+        STEP_DURATION.labels(site=site, step=name).observe(seconds)
+        LAST_STEP_DURATION.labels(site=site, step=name).set(seconds)
+
+
+@contextmanager
+def step(site: str, name: str):
+    """Mesure la durée d'une étape du vote."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe_step(site, name, time.monotonic() - start)
+
+
+@contextmanager
+def cloudflare_wait(site: str):
+    """Mesure l'attente de Cloudflare ; définir ``resolved`` sur l'objet produit."""
+    start = time.monotonic()
+    wait = SimpleNamespace(resolved=False)
+    outcome = "error"
+    try:
+        yield wait
+        outcome = "resolved" if wait.resolved else "timeout"
+    finally:
+        observe_cloudflare_wait(site, time.monotonic() - start, outcome)
+
+
+@contextmanager
+def browser_start():
+    """Mesure la durée d'initialisation du navigateur."""
+    start = time.monotonic()
+    outcome = "failure"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        if PROMETHEUS_AVAILABLE:
+            duration = time.monotonic() - start
+            BROWSER_START.labels(outcome=outcome).observe(duration)
+            LAST_BROWSER_START.labels(outcome=outcome).set(duration)
+
+
+def instrument_driver(driver):
+    """Compte les commandes WebDriver envoyées par le driver."""
+    if not PROMETHEUS_AVAILABLE:
+        return driver
+
+    execute = driver.execute
+
+    def counted_execute(driver_command, params=None):
+        WEBDRIVER_COMMANDS.labels(command=driver_command).inc()
+        LAST_WEBDRIVER_COMMANDS.labels(command=driver_command).inc()
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    return driver
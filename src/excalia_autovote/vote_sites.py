@@ -1,6 +1,7 @@
 """Classes pour gérer les votes sur les différents sites."""
 import os
 import platform
+import sys
 import time
 from typing import Optional
 from selenium import webdriver
@@ -10,21 +11,46 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from .config import HEADLESS, WAIT_TIMEOUT, PSEUDO
+from .config import HEADLESS, WAIT_TIMEOUT, PSEUDO, INTERACTIVE
+from . import metrics
+
+
+def is_interactive() -> bool:
+    """Indique si l'utilisateur peut répondre aux demandes d'action manuelle."""
+    return INTERACTIVE and sys.stdin is not None and sys.stdin.isatty()
 
 
 class BaseVoteSite:
     """Classe de base pour tous les sites de vote."""
     
+    site_name = ""
+    # Le vote nécessite une action manuelle (captcha, etc.)
+    requires_user = False
+    
     def __init__(self, driver: webdriver.Chrome, pseudo: str = PSEUDO):
         self.driver = driver
         self.pseudo = pseudo
         self.wait = WebDriverWait(driver, WAIT_TIMEOUT)
+        # Une action manuelle a été demandée pendant le vote
+        self.prompted = False
     
     def vote(self) -> bool:
         """Effectue le vote. À implémenter dans les classes filles."""
         raise NotImplementedError
     
+    @property
+    def interactive(self) -> bool:
+        """Indique si l'utilisateur peut répondre aux demandes d'action manuelle."""
+        return is_interactive()
+    
+    def ask_user(self) -> Optional[str]:
+        """Attend une réponse de l'utilisateur, ou None en mode non interactif."""
+        if not self.interactive:
+            print(f"[{self.site_name}] ⚠️ Mode non interactif, action manuelle ignorée")
+            return None
+        self.prompted = True
+        return input(">>> ")
+    
     def wait_for_element(self, by: By, value: str, timeout: int = WAIT_TIMEOUT):
         """Attend qu'un élément soit présent."""
         return WebDriverWait(self.driver, timeout).until(
@@ -41,6 +67,8 @@ class BaseVoteSite:
 class TopServeursVote(BaseVoteSite):
     """Gestion du vote sur top-serveurs.net."""
     
+    site_name = "Top-Serveurs"
+    
     def _accept_cookies(self) -> bool:
         """Accepte le pop-up de cookies en cliquant sur 'autoriser'."""
         try:
@@ -139,6 +167,49 @@ class TopServeursVote(BaseVoteSite):
             traceback.print_exc()
             return False
     
+    def _wait_for_cloudflare_validation(self) -> bool:
+        """Attend passivement la validation du défi Cloudflare détecté."""
+        max_wait = 60  # Attendre jusqu'à 60 secondes
+        initial_url = self.driver.current_url
+        
+        for i in range(max_wait):
+            try:
+                # Vérifier si le bouton de vote est activé (pas disabled)
+                vote_button = self.driver.find_element(By.ID, "btnSubmitVote")
+                if vote_button.is_enabled():
+                    print("[Top-Serveurs] ✅ Bouton de vote activé - Cloudflare validé")
+                    time.sleep(2)
+                    return True
+            except (NoSuchElementException, Exception):
+                # Le bouton n'existe pas encore ou n'est pas activé
+                pass
+        
+            # Vérifier aussi si l'iframe a disparu
+            try:
+                self.driver.find_element(By.XPATH, "//iframe[contains(@src, 'challenges.cloudflare.com')]")
+                # L'iframe existe encore, continuer à attendre
+            except NoSuchElementException:
+                # L'iframe a disparu, Cloudflare est probablement validé
+                print("[Top-Serveurs] ✅ Iframe Cloudflare disparue - validation probable")
+                time.sleep(2)
+                return True
+        
+            # Vérifier si l'URL a changé (rechargement de page)
+            current_url = self.driver.current_url
+            if current_url != initial_url:
+                print("[Top-Serveurs] ✅ Page rechargée automatiquement - Cloudflare validé")
+                time.sleep(3)
+                # Si la page s'est rechargée, le cookie devrait être déjà appliqué
+                return True
+        
+            # Attendre 1 seconde avant de revérifier
+            time.sleep(1)
+            if i % 10 == 0 and i > 0:
+                print(f"[Top-Serveurs] ⏳ Attente Cloudflare... ({i}/{max_wait}s)")
+        
+        print("[Top-Serveurs] ⚠️ Timeout lors de l'attente de Cloudflare")
+        return False
+    
     def _handle_cloudflare(self) -> bool:
         """Gère le captcha Cloudflare (Turnstile) - attend passivement la validation automatique."""
         try:
@@ -180,46 +251,9 @@ class TopServeursVote(BaseVoteSite):
                 
                 # Attendre PASSIVEMENT que Cloudflare se valide (ne rien faire, juste attendre)
                 # Vérifier si le bouton de vote devient actif (disabled disparaît)
-                max_wait = 60  # Attendre jusqu'à 60 secondes
-                initial_url = self.driver.current_url
-                
-                for i in range(max_wait):
-                    try:
-                        # Vérifier si le bouton de vote est activé (pas disabled)
-                        vote_button = self.driver.find_element(By.ID, "btnSubmitVote")
-                        if vote_button.is_enabled():
-                            print("[Top-Serveurs] ✅ Bouton de vote activé - Cloudflare validé")
-                            time.sleep(2)
-                            return True
-                    except (NoSuchElementException, Exception):
-                        # Le bouton n'existe pas encore ou n'est pas activé
-                        pass
-                    
-                    # Vérifier aussi si l'iframe a disparu
-                    try:
-                        self.driver.find_element(By.XPATH, "//iframe[contains(@src, 'challenges.cloudflare.com')]")
-                        # L'iframe existe encore, continuer à attendre
-                    except NoSuchElementException:
-                        # L'iframe a disparu, Cloudflare est probablement validé
-                        print("[Top-Serveurs] ✅ Iframe Cloudflare disparue - validation probable")
-                        time.sleep(2)
-                        return True
-                    
-                    # Vérifier si l'URL a changé (rechargement de page)
-                    current_url = self.driver.current_url
-                    if current_url != initial_url:
-                        print("[Top-Serveurs] ✅ Page rechargée automatiquement - Cloudflare validé")
-                        time.sleep(3)
-                        # Si la page s'est rechargée, le cookie devrait être déjà appliqué
-                        return True
-                    
-                    # Attendre 1 seconde avant de revérifier
-                    time.sleep(1)
-                    if i % 10 == 0 and i > 0:
-                        print(f"[Top-Serveurs] ⏳ Attente Cloudflare... ({i}/{max_wait}s)")
-                
-                print("[Top-Serveurs] ⚠️ Timeout lors de l'attente de Cloudflare")
-                return False
+                with metrics.cloudflare_wait(self.site_name) as wait:
+                    wait.resolved = self._wait_for_cloudflare_validation()
+                return wait.resolved
             else:
                 print("[Top-Serveurs] Aucun défi Cloudflare détecté")
                 return True
@@ -230,23 +264,58 @@ class TopServeursVote(BaseVoteSite):
             traceback.print_exc()
             return False
     
+    def _find_vote_button(self):
+        """Cherche le bouton de vote (ID: btnSubmitVote, puis sélecteurs alternatifs)."""
+        print("[Top-Serveurs] Recherche du bouton de vote...")
+        vote_button = None
+        
+        # Essayer d'abord avec l'ID spécifique
+        try:
+            vote_button = self.wait_for_clickable(By.ID, "btnSubmitVote", timeout=10)
+            if vote_button.is_displayed():
+                print("[Top-Serveurs] Bouton de vote trouvé (ID: btnSubmitVote)")
+        except (TimeoutException, NoSuchElementException):
+            print("[Top-Serveurs] Bouton avec ID 'btnSubmitVote' non trouvé, recherche alternative...")
+            # Fallback sur d'autres sélecteurs
+            vote_button_selectors = [
+                "//button[@id='btnSubmitVote']",
+                "//button[contains(text(), 'Voter')]",
+                "//input[@value='Voter']",
+                "//a[contains(text(), 'Voter')]",
+                "//button[contains(@class, 'vote')]",
+                "//input[@type='submit']",
+                "//form//button[@type='submit']",
+            ]
+        
+            for selector in vote_button_selectors:
+                try:
+                    vote_button = self.wait_for_clickable(By.XPATH, selector, timeout=5)
+                    if vote_button.is_displayed():
+                        break
+                except (TimeoutException, NoSuchElementException):
+                    continue
+        
+        return vote_button
+    
     def vote(self) -> bool:
         """Vote sur top-serveurs.net (avec gestion cookies et Cloudflare)."""
         try:
             url = f"https://top-serveurs.net/minecraft/vote/excalia?pseudo={self.pseudo}"
             print(f"[Top-Serveurs] Accès à {url}")
-            self.driver.get(url)
+            with metrics.step(self.site_name, "page_load"):
+                self.driver.get(url)
             
             # Attendre le chargement initial
             time.sleep(5)
             
             # 1. Accepter les cookies (cliquer sur "autoriser")
-            cookies_accepted = self._accept_cookies()
+            with metrics.step(self.site_name, "cookies"):
+                cookies_accepted = self._accept_cookies()
             if not cookies_accepted:
                 print("[Top-Serveurs] ⚠️ Bouton 'autoriser' non trouvé automatiquement")
                 print("[Top-Serveurs] 💡 Veuillez cliquer sur 'autoriser' manuellement")
                 print("[Top-Serveurs] 💡 Appuyez sur Entrée pour continuer...")
-                input(">>> ")
+                self.ask_user()
             time.sleep(2)
             
             # 2. Définir le cookie vote_player avec le pseudo (AVANT Cloudflare)
@@ -264,7 +333,8 @@ class TopServeursVote(BaseVoteSite):
                 print(f"[Top-Serveurs] ⚠️ Erreur lors de la définition du cookie: {e}")
             
             # 3. Gérer Cloudflare - attendre passivement qu'il se valide
-            cloudflare_resolved = self._handle_cloudflare()
+            with metrics.step(self.site_name, "cloudflare"):
+                cloudflare_resolved = self._handle_cloudflare()
             
             if not cloudflare_resolved:
                 print("[Top-Serveurs] ❌ Cloudflare non résolu - le vote ne peut pas continuer")
@@ -291,34 +361,8 @@ class TopServeursVote(BaseVoteSite):
                 time.sleep(4)
             
             # 4. Chercher et cliquer sur le bouton de vote (ID: btnSubmitVote)
-            print("[Top-Serveurs] Recherche du bouton de vote...")
-            vote_button = None
-            
-            # Essayer d'abord avec l'ID spécifique
-            try:
-                vote_button = self.wait_for_clickable(By.ID, "btnSubmitVote", timeout=10)
-                if vote_button.is_displayed():
-                    print("[Top-Serveurs] Bouton de vote trouvé (ID: btnSubmitVote)")
-            except (TimeoutException, NoSuchElementException):
-                print("[Top-Serveurs] Bouton avec ID 'btnSubmitVote' non trouvé, recherche alternative...")
-                # Fallback sur d'autres sélecteurs
-                vote_button_selectors = [
-                    "//button[@id='btnSubmitVote']",
-                    "//button[contains(text(), 'Voter')]",
-                    "//input[@value='Voter']",
-                    "//a[contains(text(), 'Voter')]",
-                    "//button[contains(@class, 'vote')]",
-                    "//input[@type='submit']",
-                    "//form//button[@type='submit']",
-                ]
-                
-                for selector in vote_button_selectors:
-                    try:
-                        vote_button = self.wait_for_clickable(By.XPATH, selector, timeout=5)
-                        if vote_button.is_displayed():
-                            break
-                    except (TimeoutException, NoSuchElementException):
-                        continue
+            with metrics.step(self.site_name, "find_button"):
+                vote_button = self._find_vote_button()
             
             if vote_button:
                 # Utiliser JavaScript pour cliquer (contourne les éléments qui interceptent)
@@ -347,11 +391,19 @@ class TopServeursVote(BaseVoteSite):
 class ServeurPriveVote(BaseVoteSite):
     """Gestion du vote sur serveur-prive.net (avec captcha)."""
     
+    site_name = "Serveur-Prive"
+    requires_user = True
+    
     def vote(self) -> bool:
         """Vote sur serveur-prive.net (avec captcha et cookie)."""
+        if not self.interactive:
+            print("[Serveur-Prive] ❌ Captcha manuel impossible en mode non interactif, vote ignoré")
+            return False
+        
         try:
             print(f"[Serveur-Prive] Accès à la page de vote")
-            self.driver.get("https://serveur-prive.net/minecraft/excalia/vote")
+            with metrics.step(self.site_name, "page_load"):
+                self.driver.get("https://serveur-prive.net/minecraft/excalia/vote")
             
             time.sleep(2)
             
@@ -386,12 +438,15 @@ class ServeurPriveVote(BaseVoteSite):
             
             # Gestion du captcha (simple - laisser l'utilisateur le résoudre)
             print("[Serveur-Prive] ⚠️ Veuillez résoudre le captcha et voter manuellement...")
-            print("[Serveur-Prive] Appuyez sur Entrée une fois le vote effectué...")
+            print("[Serveur-Prive] Appuyez sur Entrée une fois le vote effectué ('n' si le vote a échoué)...")
             
             # Attendre que l'utilisateur résolve le captcha et vote
-            input(">>> ")
+            answer = self.ask_user()
+            if answer is None or answer.strip().lower() in ("n", "non"):
+                print("[Serveur-Prive] ❌ Vote non effectué")
+                return False
             
-            print("[Serveur-Prive] ✅ Vote considéré comme effectué")
+            print("[Serveur-Prive] ✅ Vote confirmé par l'utilisateur")
             time.sleep(1)
             return True
             
@@ -403,12 +458,15 @@ class ServeurPriveVote(BaseVoteSite):
 class ServeurMinecraftVoteVote(BaseVoteSite):
     """Gestion du vote sur serveur-minecraft-vote.fr."""
     
+    site_name = "Serveur-Minecraft-Vote"
+    
     def vote(self) -> bool:
         """Vote sur serveur-minecraft-vote.fr (pseudo pré-rempli, bouton déconnecté)."""
         try:
             print(f"[Serveur-Minecraft-Vote] Accès à la page de vote")
             url = "https://serveur-minecraft-vote.fr/serveurs/playexcaliafr-1214-calamity-update-s1.1718/vote"
-            self.driver.get(url)
+            with metrics.step(self.site_name, "page_load"):
+                self.driver.get(url)
             
             time.sleep(3)
             
@@ -446,12 +504,15 @@ class ServeurMinecraftVoteVote(BaseVoteSite):
 class ServeurMinecraftVote(BaseVoteSite):
     """Gestion du vote sur serveur-minecraft.com (pseudo dans URL, case à cocher)."""
     
+    site_name = "Serveur-Minecraft"
+    
     def vote(self) -> bool:
         """Vote sur serveur-minecraft.com (case à cocher)."""
         try:
             url = f"https://serveur-minecraft.com/2168?pseudo={self.pseudo}"
             print(f"[Serveur-Minecraft] Accès à {url}")
-            self.driver.get(url)
+            with metrics.step(self.site_name, "page_load"):
+                self.driver.get(url)
             
             time.sleep(2)
             
@@ -0,0 +1,178 @@
+"""Tests de l'orchestration des sessions de vote."""
+import io
+
+import pytest
+
+from excalia_autovote import main, metrics
+from excalia_autovote.vote_sites import BaseVoteSite
+
+
+requires_prometheus = pytest.mark.skipif(
+    not metrics.PROMETHEUS_AVAILABLE, reason="prometheus_client non installé"
+)
+
+
+class StubDriver:
+    """Driver minimal sans navigateur."""
+
+    def execute(self, driver_command, params=None):
+        return {"value": None}
+
+    def quit(self):
+        pass
+
+
+def make_site(name, result=True, requires_user=False, prompt=False):
+    """Crée une classe de site dont le vote renvoie ou lève ``result``."""
+
+    def __init__(self, driver, pseudo):
+        self.prompted = False
+
+    def vote(self):
+        self.prompted = prompt
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    return type(
+        f"Stub{name}",
+        (),
+        {
+            "site_name": name,
+            "requires_user": requires_user,
+            "__init__": __init__,
+            "vote": vote,
+        },
+    )
+
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, labels)
+
+
+@pytest.fixture
+def textfile(monkeypatch, tmp_path):
+    path = tmp_path / "autovote.prom"
+    monkeypatch.setattr(main, "create_driver", lambda headless: StubDriver())
+    monkeypatch.setattr(main, "is_interactive", lambda: True)
+    monkeypatch.setattr(main, "METRICS_TEXTFILE", str(path))
+    monkeypatch.setattr(main, "METRICS_PORT", 0)
+    monkeypatch.setattr(main, "VOTE_INTERVAL", 0)
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+    return path
+
+
+def set_sites(monkeypatch, *sites):
+    monkeypatch.setattr(main, "VOTE_SITES", list(sites))
+
+
+@requires_prometheus
+def test_run_votes_success(monkeypatch, textfile):
+    set_sites(monkeypatch, make_site("Ok-1"), make_site("Ok-2"))
+    before = sample("excalia_autovote_runs_total", outcome="success")
+
+    assert main.run_votes() == {"Ok-1": True, "Ok-2": True}
+
+    assert sample("excalia_autovote_runs_total", outcome="success") == before + 1
+    assert sample("excalia_autovote_votes_succeeded_total", site="Ok-1") == 1
+    assert sample("excalia_autovote_step_duration_seconds_count", site="Ok-1", step="total") == 1
+    assert 'excalia_autovote_last_vote_success{site="Ok-2"} 1.0' in textfile.read_text()
+
+
+@requires_prometheus
+def test_run_votes_failure(monkeypatch, textfile):
+    set_sites(monkeypatch, make_site("Fail-1", result=False), make_site("Fail-2"))
+    before = sample("excalia_autovote_runs_total", outcome="failure")
+
+    assert main.run_votes() == {"Fail-1": False, "Fail-2": True}
+
+    assert sample("excalia_autovote_runs_total", outcome="failure") == before + 1
+    assert sample("excalia_autovote_votes_failed_total", site="Fail-1") == 1
+    assert sample("excalia_autovote_last_run_success") == 0
+
+
+@requires_prometheus
+def test_run_votes_error_counts_unreached_sites(monkeypatch, textfile):
+    def broken_driver(headless):
+        raise RuntimeError("chrome introuvable")
+
+    monkeypatch.setattr(main, "create_driver", broken_driver)
+    set_sites(monkeypatch, make_site("Crash-1"), make_site("Crash-2"))
+    before = sample("excalia_autovote_runs_total", outcome="error")
+
+    assert main.run_votes() == {"Crash-1": False, "Crash-2": False}
+
+    assert sample("excalia_autovote_runs_total", outcome="error") == before + 1
+    for site in ("Crash-1", "Crash-2"):
+        assert sample("excalia_autovote_votes_attempted_total", site=site) == 1
+        assert sample("excalia_autovote_votes_failed_total", site=site) == 1
+
+
+@requires_prometheus
+def test_run_votes_reraises_interrupt_after_writing_metrics(monkeypatch, textfile):
+    set_sites(monkeypatch, make_site("Stop-1", result=KeyboardInterrupt()), make_site("Stop-2"))
+
+    with pytest.raises(KeyboardInterrupt):
+        main.run_votes()
+
+    assert textfile.exists()
+    assert sample("excalia_autovote_votes_failed_total", site="Stop-1") == 1
+    assert sample("excalia_autovote_votes_failed_total", site="Stop-2") == 1
+
+
+@requires_prometheus
+def test_run_votes_skips_manual_sites_when_not_interactive(monkeypatch, textfile):
+    monkeypatch.setattr(main, "is_interactive", lambda: False)
+    set_sites(monkeypatch, make_site("Manual", requires_user=True), make_site("Auto"))
+    before = sample("excalia_autovote_runs_total", outcome="success")
+
+    assert main.run_votes() == {"Auto": True}
+
+    assert sample("excalia_autovote_votes_skipped_total", site="Manual") == 1
+    assert sample("excalia_autovote_votes_attempted_total", site="Manual") == 0
+    assert sample("excalia_autovote_votes_failed_total", site="Manual") == 0
+    assert sample("excalia_autovote_runs_total", outcome="success") == before + 1
+
+
+@requires_prometheus
+def test_run_votes_does_not_time_prompted_votes(monkeypatch, textfile):
+    set_sites(monkeypatch, make_site("Prompted", prompt=True))
+
+    main.run_votes()
+
+    assert sample("excalia_autovote_step_duration_seconds_count", site="Prompted", step="total") is None
+
+
+def test_main_exit_code(monkeypatch, textfile):
+    set_sites(monkeypatch, make_site("Exit-Ok"))
+    assert main.main() == 0
+
+    set_sites(monkeypatch, make_site("Exit-Ok"), make_site("Exit-Fail", result=False))
+    assert main.main() == 1
+
+
+def test_main_exit_code_without_results(monkeypatch, textfile):
+    monkeypatch.setattr(main, "is_interactive", lambda: False)
+    set_sites(monkeypatch, make_site("Only-Manual", requires_user=True))
+
+    assert main.main() == 1
+
+
+def test_main_exit_code_on_interrupt(monkeypatch, textfile):
+    monkeypatch.setattr(main, "VOTE_INTERVAL", 5)
+    set_sites(monkeypatch, make_site("Interrupted", result=KeyboardInterrupt()))
+
+    assert main.main() == 1
+
+
+def test_ask_user_without_tty(monkeypatch):
+    def unexpected_input(prompt=""):
+        raise AssertionError("input() ne doit pas être appelé sans terminal")
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+    monkeypatch.setattr("builtins.input", unexpected_input)
+    site = BaseVoteSite(StubDriver())
+
+    assert site.interactive is False
+    assert site.ask_user() is None
+    assert site.prompted is False
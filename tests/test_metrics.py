@@ -0,0 +1,205 @@
+"""Tests du module de métriques."""
+import socket
+
+import pytest
+
+from excalia_autovote import metrics
+
+
+requires_prometheus = pytest.mark.skipif(
+    not metrics.PROMETHEUS_AVAILABLE, reason="prometheus_client non installé"
+)
+
+
+class StubDriver:
+    """Driver minimal enregistrant les commandes reçues."""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, driver_command, params=None):
+        self.commands.append((driver_command, params))
+        return {"value": None}
+
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, labels)
+
+
+def test_noop_without_prometheus(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "PROMETHEUS_AVAILABLE", False)
+    driver = StubDriver()
+    execute = driver.execute
+
+    metrics.start_run(["Site"])
+    metrics.record_vote("Site", True)
+    metrics.record_run("success")
+    metrics.observe_cloudflare_wait("Site", 1.0, "resolved")
+    with metrics.step("Site", "page_load"):
+        pass
+    with metrics.browser_start():
+        pass
+    with metrics.cloudflare_wait("Site") as wait:
+        wait.resolved = True
+
+    assert metrics.instrument_driver(driver) is driver
+    assert driver.execute == execute
+    assert metrics.start_server(0) is False
+    assert metrics.write_textfile(str(tmp_path / "autovote.prom")) is False
+    assert not (tmp_path / "autovote.prom").exists()
+
+
+@requires_prometheus
+def test_start_run_initialises_vote_series():
+    metrics.start_run(["Init-Site"])
+
+    for name in ("attempted", "succeeded", "failed"):
+        assert sample(f"excalia_autovote_votes_{name}_total", site="Init-Site") == 0
+
+
+@requires_prometheus
+def test_record_vote_routes_success_and_failure():
+    metrics.record_vote("Vote-Site", True)
+    metrics.record_vote("Vote-Site", False)
+    metrics.record_vote("Vote-Site", False)
+
+    assert sample("excalia_autovote_votes_attempted_total", site="Vote-Site") == 3
+    assert sample("excalia_autovote_votes_succeeded_total", site="Vote-Site") == 1
+    assert sample("excalia_autovote_votes_failed_total", site="Vote-Site") == 2
+    assert sample("excalia_autovote_last_vote_success", site="Vote-Site") == 0
+
+
+@requires_prometheus
+def test_record_run_sets_last_success_only_on_success():
+    metrics.record_run("success")
+    last_success = sample("excalia_autovote_last_success_timestamp_seconds")
+
+    metrics.record_run("error")
+
+    assert sample("excalia_autovote_last_run_success") == 0
+    assert sample("excalia_autovote_last_success_timestamp_seconds") == last_success
+    assert sample("excalia_autovote_runs_total", outcome="failure") is not None
+
+
+@requires_prometheus
+def test_browser_start_failure_is_labelled():
+    before = sample("excalia_autovote_browser_start_seconds_count", outcome="failure") or 0
+
+    with pytest.raises(RuntimeError):
+        with metrics.browser_start():
+            raise RuntimeError("chrome introuvable")
+
+    after = sample("excalia_autovote_browser_start_seconds_count", outcome="failure")
+    assert after == before + 1
+    assert sample("excalia_autovote_last_browser_start_seconds", outcome="failure") is not None
+    assert sample("excalia_autovote_last_browser_start_seconds", outcome="success") is None
+
+
+@requires_prometheus
+def test_cloudflare_wait_outcomes():
+    metrics.start_run([])
+    with metrics.cloudflare_wait("Cloudflare-Site") as wait:
+        wait.resolved = True
+    with metrics.cloudflare_wait("Cloudflare-Site"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.cloudflare_wait("Cloudflare-Site"):
+            raise RuntimeError("driver perdu")
+
+    for outcome in ("resolved", "timeout", "error"):
+        assert sample(
+            "excalia_autovote_cloudflare_wait_seconds_count", site="Cloudflare-Site", outcome=outcome
+        ) == 1
+        assert sample(
+            "excalia_autovote_last_cloudflare_wait_seconds", site="Cloudflare-Site", outcome=outcome
+        ) is not None
+
+
+@requires_prometheus
+def test_instrument_driver_counts_commands():
+    driver = StubDriver()
+    before = sample("excalia_autovote_webdriver_commands_total", command="get") or 0
+
+    metrics.instrument_driver(driver)
+    driver.execute("get", {"url": "https://example.com"})
+    driver.execute("get", {"url": "https://example.com"})
+
+    assert sample("excalia_autovote_webdriver_commands_total", command="get") == before + 2
+    assert driver.commands == [("get", {"url": "https://example.com"})] * 2
+
+
+@requires_prometheus
+def test_last_webdriver_commands_reset_by_start_run():
+    driver = metrics.instrument_driver(StubDriver())
+    driver.execute("findElement")
+
+    metrics.start_run([])
+    driver.execute("findElement")
+
+    assert sample("excalia_autovote_last_webdriver_commands", command="findElement") == 1
+
+
+@requires_prometheus
+def test_write_textfile_contains_only_last_run_gauges(tmp_path):
+    path = tmp_path / "autovote.prom"
+    metrics.start_run(["Textfile-Site"])
+    metrics.record_vote("Textfile-Site", True)
+    with metrics.step("Textfile-Site", "page_load"):
+        pass
+
+    assert metrics.write_textfile(str(path)) is True
+
+    content = path.read_text()
+    assert 'excalia_autovote_last_vote_success{site="Textfile-Site"} 1.0' in content
+    assert "excalia_autovote_last_webdriver_commands" in content
+    assert 'excalia_autovote_last_step_duration_seconds{site="Textfile-Site",step="page_load"}' in content
+    assert "_total" not in content
+    assert "_bucket" not in content
+
+
+@requires_prometheus
+def test_write_textfile_omits_last_success_after_failed_run(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics.LAST_SUCCESS, "value", None)
+    path = tmp_path / "autovote.prom"
+    metrics.start_run(["A"])
+    with pytest.raises(RuntimeError):
+        with metrics.browser_start():
+            raise RuntimeError("chrome introuvable")
+    metrics.record_vote("A", False)
+    metrics.record_run("failure")
+
+    assert metrics.write_textfile(str(path)) is True
+
+    content = path.read_text()
+    assert "excalia_autovote_last_success_timestamp_seconds" not in content
+    assert 'excalia_autovote_last_browser_start_seconds{outcome="failure"}' in content
+    assert 'outcome="success"' not in content
+
+
+@requires_prometheus
+def test_write_textfile_keeps_previous_last_success(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics.LAST_SUCCESS, "value", None)
+    path = tmp_path / "autovote.prom"
+    path.write_text("excalia_autovote_last_success_timestamp_seconds 1.7e+09\n")
+    metrics.record_run("failure")
+
+    assert metrics.write_textfile(str(path)) is True
+
+    assert "excalia_autovote_last_success_timestamp_seconds 1.7e+09" in path.read_text()
+
+
+@requires_prometheus
+def test_write_textfile_handles_oserror(tmp_path):
+    path = tmp_path / "absent" / "autovote.prom"
+
+    assert metrics.write_textfile(str(path)) is False
+
+
+@requires_prometheus
+def test_start_server_handles_port_in_use():
+    with socket.socket() as sock:
+        sock.bind(("", 0))
+        sock.listen()
+        port = sock.getsockname()[1]
+
+        assert metrics.start_server(port) is False